@@ -1,14 +1,18 @@
 import json
 import os
+import sys
+import time
 import ast
 import re
 import shutil
 import subprocess
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import urllib3
 from deepdiff import DeepDiff
 
+from coingecko_py.coingecko_py import RATE_LIMIT_STATUS_CODE
 from coingecko_py.utils.api_meta import api_meta
 from coingecko_py.utils.utils import logger_temp_level
 from coingecko_py.utils.constants import (
@@ -19,12 +23,19 @@ from coingecko_py.utils.constants import (
     SWAGGER_DATA_PATH,
     SWAGGER_API_DOCS_PATH,
     PROCESSED_DOCS_PATH,
+    TEST_API_RESPONSES_PATH,
+    TEST_API_RESPONSE_URLS_PATH,
 )
 
 
 logging.basicConfig()
 logger = logging.getLogger(__name__)
 
+TEST_DATA_MAX_WORKERS = 8
+TEST_DATA_MAX_RETRIES = 5
+# strips the braces from path parameter placeholders e.g. {id} ---> id
+BRACE_STRIP_TABLE = str.maketrans("", "", "{}")
+
 
 def download_spec(output_path=RAW_SPEC_PATH, silent=False):
     """Downloads coingecko API spec. Returns as dict. Will raise an exception if command fails."""
@@ -114,15 +125,19 @@ def validate_dependencies():
 
 def generate_url_to_method_map(spec):
     # get a mapping from url templates to auto-generated methods
-    methods = []
     source = api_meta.get_api_client_source_code()
-    p = ast.parse(source)
-    methods = [node.name for node in ast.walk(p) if isinstance(node, ast.FunctionDef)]
+    tree = ast.parse(source)
+    # api methods are defined directly on the generated api class
+    methods = {
+        node.name
+        for cls in tree.body
+        if isinstance(cls, ast.ClassDef)
+        for node in cls.body
+        if isinstance(node, ast.FunctionDef)
+    }
     url_to_method = dict()
     for url_template in spec["paths"].keys():
-        parts = [
-            p.replace("{", "").replace("}", "") for p in url_template.split("/") if p
-        ]
+        parts = [p.translate(BRACE_STRIP_TABLE) for p in url_template.split("/") if p]
         method_name = "_".join(parts + ["get"])
         assert method_name in methods
         url_to_method[url_template] = method_name
@@ -233,7 +248,7 @@ def generate_client():
 @logger_temp_level(logger, logging.INFO)
 def generate_test_data_template():
     template = dict()
-    spec = api_meta.get_spec(processed=True)
+    spec = api_meta.get_spec_processed()
     for path, path_spec in spec["paths"].items():
         template[path] = {"path": list(), "query": dict()}
         assert "get" in path_spec
@@ -248,8 +263,39 @@ def generate_test_data_template():
     api_meta.write_test_api_calls(template)
 
 
+def _request_test_data(pool, path):
+    """Requests path from the pool, backing off exponentially while rate limited"""
+    logger.info(path)
+    for attempt in range(TEST_DATA_MAX_RETRIES + 1):
+        r = pool.request("GET", path)
+        if r.status != RATE_LIMIT_STATUS_CODE or attempt == TEST_DATA_MAX_RETRIES:
+            break
+        time.sleep(2**attempt)
+    if r.status != 200:
+        raise Exception(r.status)
+    content = json.loads(r.data)
+    assert content
+    return content
+
+
 @logger_temp_level(logger, logging.INFO)
-def generate_test_data():
+def generate_test_data(refresh=None):
+    """Requests test data for every test api call and writes responses to file.
+    A response on file is reused if it was requested from the same url, unless
+    refresh is set, which defaults to whether the --refresh flag was passed on the
+    command line.
+    """
+    if refresh is None:
+        refresh = "--refresh" in sys.argv[1:]
+    data_existing = dict()
+    urls_existing = dict()
+    if (
+        not refresh
+        and os.path.exists(TEST_API_RESPONSES_PATH)
+        and os.path.exists(TEST_API_RESPONSE_URLS_PATH)
+    ):
+        data_existing = api_meta.get_test_api_responses()
+        urls_existing = api_meta.get_test_api_response_urls()
     test_api_calls = api_meta.get_test_api_calls()
     # Generate urls to request from the test api call spec
     urls = [
@@ -261,16 +307,47 @@ def generate_test_data():
         )
         for url_template, data in test_api_calls.items()
     ]
-    # perform api calls to get test data for mock based testing.
-    pool_manager = urllib3.PoolManager(num_pools=4, maxsize=4)
-    data = dict()
-    for url_template, url in urls:
-        logger.info(url)
-        r = pool_manager.request("GET", url)
-        if r.status != 200:
-            raise Exception(r.status)
-        content = json.loads(r.data.decode("utf-8"))
-        assert content
-        data[url_template] = content
-    # write responses to file
+    # responses are only reused if the test api call still materializes to the
+    # url the response was requested from
+    reused = {
+        url_template
+        for url_template, url in urls
+        if data_existing.get(url_template) and urls_existing.get(url_template) == url
+    }
+    # perform api calls to get test data for mock based testing. all urls share
+    # a single host so requests are made concurrently against one keep-alive
+    # connection pool
+    scheme, host, _ = api_meta.get_url_base_parts()
+    url_origin = f"{scheme}://{host}"
+    pool = urllib3.connection_from_url(
+        url_origin, maxsize=TEST_DATA_MAX_WORKERS, block=True
+    )
+    fetched = dict()
+    with ThreadPoolExecutor(max_workers=TEST_DATA_MAX_WORKERS) as executor:
+        futures = dict()
+        for url_template, url in urls:
+            if url_template in reused:
+                continue
+            assert url.startswith(url_origin)
+            future = executor.submit(_request_test_data, pool, url[len(url_origin) :])
+            futures[future] = url_template
+        try:
+            for future in as_completed(futures):
+                fetched[futures[future]] = future.result()
+        except Exception:
+            # stop requesting from the api on the first failure
+            for future in futures:
+                future.cancel()
+            raise
+    # retain the ordering of the test api calls
+    data = {
+        url_template: (
+            data_existing[url_template]
+            if url_template in reused
+            else fetched[url_template]
+        )
+        for url_template, _ in urls
+    }
+    # write responses and the urls they were requested from to file
     api_meta.write_test_api_responses(data)
+    api_meta.write_test_api_response_urls(dict(urls))
@@ -1,9 +1,9 @@
 import json
 import re
+import functools
+import itertools
 import pkg_resources
-import urllib.parse as urlparse
 from urllib.parse import urlencode
-from copy import copy
 
 import toml
 
@@ -17,10 +17,14 @@ from coingecko_py.utils.constants import (
     URL_TO_METHOD_PATH,
     TEST_API_CALLS_PATH,
     TEST_API_RESPONSES_PATH,
+    TEST_API_RESPONSE_URLS_PATH,
     SWAGGER_API_DOCS_PATH,
     PROCESSED_DOCS_PATH,
 )
 
+# matches path parameter placeholders within a url template e.g. {id}
+PATH_TOKEN_RE = re.compile(r"{[^}]*}")
+
 
 class ApiMeta:
 
@@ -28,23 +32,25 @@ class ApiMeta:
 
     def read(self, path, is_json=True):
         with open(path, "r") as f:
-            data = f.read()
             if is_json:
-                data = json.loads(data)
-        return data
+                return json.load(f)
+            return f.read()
 
     def write(self, path, data, is_json=True):
         with open(path, "w") as f:
             if is_json:
-                data = json.dumps(data, indent=4)
-            f.write(data)
+                json.dump(data, f, indent=4)
+            else:
+                f.write(data)
 
     """ READS """
 
     def get_spec_raw(self):
         return self.read(RAW_SPEC_PATH)
 
+    @functools.lru_cache(maxsize=1)
     def get_spec_processed(self):
+        # cached as it is read on every url materialization. Callers must not mutate
         return self.read(FORMATTED_SPEC_PATH)
 
     def get_docs_generated(self):
@@ -56,16 +62,22 @@ class ApiMeta:
     def get_test_api_calls(self):
         return self.read(TEST_API_CALLS_PATH)
 
+    @functools.lru_cache(maxsize=1)
     def get_url_to_method(self):
         return self.read(URL_TO_METHOD_PATH)
 
     def get_test_api_responses(self):
         return self.read(TEST_API_RESPONSES_PATH)
 
+    def get_test_api_response_urls(self):
+        return self.read(TEST_API_RESPONSE_URLS_PATH)
+
     """ WRITES """
 
     def write_spec_processed(self, spec):
         self.write(FORMATTED_SPEC_PATH, spec)
+        self.get_spec_processed.cache_clear()
+        self.get_url_base_parts.cache_clear()
 
     def write_spec_diff(self, diff):
         self.write(DIFF_SPEC_PATH, diff, is_json=False)
@@ -75,6 +87,7 @@ class ApiMeta:
 
     def write_url_to_method(self, url_to_method):
         self.write(URL_TO_METHOD_PATH, url_to_method)
+        self.get_url_to_method.cache_clear()
 
     def write_test_api_calls(self, test_api_calls):
         self.write(TEST_API_CALLS_PATH, test_api_calls)
@@ -82,35 +95,36 @@ class ApiMeta:
     def write_test_api_responses(self, test_api_responses):
         self.write(TEST_API_RESPONSES_PATH, test_api_responses)
 
+    def write_test_api_response_urls(self, test_api_response_urls):
+        self.write(TEST_API_RESPONSE_URLS_PATH, test_api_response_urls)
+
     """ OTHER """
 
     def get_parameters(self, url_template):
         spec = self.get_spec_processed()
         return spec["paths"][url_template]["get"].get("parameters", [])
 
-    def get_url_base(self):
+    @functools.lru_cache(maxsize=1)
+    def get_url_base_parts(self):
         spec = self.get_spec_processed()
         host = spec["host"]
         basePath = spec["basePath"]
         schemes = spec["schemes"]
         assert len(schemes) == 1
         scheme = schemes[0]
-        url_parts = [scheme, host, basePath, "", "", ""]
-        url = urlparse.urlunparse(url_parts)
-        return url
+        return scheme, host, basePath
 
     def get_api_method_names(self):
         return list(self.get_url_to_method().values())
 
     def get_paginated_method_names(self):
+        spec = self.get_spec_processed()
         url_to_methods = self.get_url_to_method()
         paged_method_names = list()
         for url_template, method_name in url_to_methods.items():
-            params = filter(
-                lambda p: p["name"] in ["page", "per_page"],
-                self.get_parameters(url_template),
-            )
-            if len(list(params)) == 2:
+            params = spec["paths"][url_template]["get"].get("parameters", [])
+            names = {p["name"] for p in params}
+            if "page" in names and "per_page" in names:
                 paged_method_names.append(method_name)
         return paged_method_names
 
@@ -121,7 +135,7 @@ class ApiMeta:
 
     def get_poetry_dependencies(self):
         with open(POETRY_PROJECT_FILE_PATH, "r") as f:
-            poetry = toml.loads(f.read())
+            poetry = toml.load(f)
             deps = poetry["tool"]["poetry"]["dependencies"]
             return deps
 
@@ -145,25 +159,23 @@ class ApiMeta:
         output:
             https://api.coingecko.com/api/v3/coins/ethereum/contract/0x1f9840a85d5aF5bf1D1762F925BDADdC4201F984/market_chart/range?vs_currency=eur&from=1622520000&to=1638334800
         """
-        url_base = self.get_url_base()
-        url_base_parts = list(urlparse.urlparse(url_base))
-        # transform /coins/{id}/contract/{contract_address} ---> /coins/{0}/contract/{1}
-        path_tokens = re.findall(r"({[^}]*})", url_template)
-        url = url_template
-        for i, p in enumerate(path_tokens):
-            url = url.replace(p, "{" + str(i) + "}")
-        # construct full url
-        url_parts = list(urlparse.urlparse(url))
-        url_parts[0] = url_base_parts[0]
-        url_parts[1] = url_base_parts[1]
-        # add path_args to path
-        url_parts[2] = url_base_parts[2] + url.format(*path_args)
-        # add query_args as query string parameters
-        query = dict(urlparse.parse_qsl(url_parts[4]))
-        query.update(query_args)
-        url_parts[4] = urlencode(query)
-        url = urlparse.urlunparse(url_parts)
-        return url
+        scheme, host, basePath = self.get_url_base_parts()
+        # add path_args to path. url templates never carry a query string, so the
+        # query_args can be encoded and appended directly
+        path = self.get_path_format(url_template).format(*path_args)
+        query = "?" + urlencode(query_args) if query_args else ""
+        return f"{scheme}://{host}{basePath}{path}{query}"
+
+    @functools.lru_cache(maxsize=1024)
+    def get_path_format(self, url_template):
+        """Converts url template to a positional format string. Only depends on
+        url_template so is cached, while args are formatted into it per call.
+
+        input: /coins/{id}/contract/{contract_address}
+        output: /coins/{0}/contract/{1}
+        """
+        counter = itertools.count()
+        return PATH_TOKEN_RE.sub(lambda m: "{" + str(next(counter)) + "}", url_template)
 
     def transform_path_query_to_args_kwargs(self, url_template, path_args, query_args):
         """converts set of path_args and query_args to set of args and kwargs
@@ -173,16 +185,17 @@ class ApiMeta:
         - query args that required are args
         - query args that are optional are kwargs
 
-        Order matters here
+        Order matters here. If there are no required query args, path_args and
+        query_args are returned as is rather than copied.
         """
         params = self.get_parameters(url_template)
-        args = copy(path_args)
-        kwargs = copy(query_args)
-        for p in params:
-            if p["required"] and p["in"] == "query":
-                name = p["name"]
-                args.append(kwargs[name])
-                del kwargs[name]
+        required = [p["name"] for p in params if p["required"] and p["in"] == "query"]
+        if not required:
+            return path_args, query_args
+        args = list(path_args)
+        kwargs = dict(query_args)
+        for name in required:
+            args.append(kwargs.pop(name))
         return args, kwargs
 
 
@@ -15,6 +15,7 @@ SWAGGER_DATA_PATH = os.environ["SWAGGER_DATA_PATH"]
 URL_TO_METHOD_PATH = os.environ["URL_TO_METHOD_PATH"]
 TEST_API_CALLS_PATH = os.environ["TEST_API_CALLS_PATH"]
 TEST_API_RESPONSES_PATH = os.environ["TEST_API_RESPONSES_PATH"]
+TEST_API_RESPONSE_URLS_PATH = os.environ["TEST_API_RESPONSE_URLS_PATH"]
 SWAGGER_API_DOCS_PATH = os.environ["SWAGGER_API_DOCS_PATH"]
 PROCESSED_DOCS_PATH = os.environ["PROCESSED_DOCS_PATH"]
 COVERAGE_PATH = os.environ["COVERAGE_PATH"]
@@ -1,3 +1,4 @@
+import functools
 from typing import List
 from collections import OrderedDict
 from contextlib import contextmanager
@@ -37,9 +38,11 @@ def extract_from_querystring(url: str, params: List[str]):
     return with_keys(query, *params)
 
 
+@functools.lru_cache(maxsize=4096)
 def sort_querystring(url: str):
     # Sorts querystring by key in ascending order. Useful for normalization
-    # when comparing two urls for equivalence
+    # when comparing two urls for equivalence. Cached as the same urls are
+    # normalized repeatedly when comparing requested urls
     url_parts = list(urlparse.urlparse(url))
     query = dict(urlparse.parse_qsl(url_parts[4]))
     query = OrderedDict(sorted(query.items()))
@@ -47,6 +50,15 @@ def sort_querystring(url: str):
     return urlunparse(url_parts)
 
 
+@functools.lru_cache(maxsize=4096)
+def canonicalize_url(url: str):
+    # Hashable form of a url that ignores querystring param order. Cheaper than
+    # sort_querystring when urls only need to be compared, as nothing is re-encoded
+    parts = urlparse.urlsplit(url)
+    query = frozenset(urlparse.parse_qsl(parts.query))
+    return (parts.scheme, parts.netloc, parts.path, query)
+
+
 def dict_get(obj, *args, default=None):
     return tuple(obj.get(k, default) for k in args)
 
@@ -1,3 +1,4 @@
+import re
 import math
 import json
 import pytest
@@ -11,6 +12,7 @@ from requests.exceptions import HTTPError
 from coingecko_py import CoingeckoApi, error_msgs
 from coingecko_py.utils.api_meta import api_meta
 from coingecko_py.utils.utils import (
+    canonicalize_url,
     extract_from_querystring,
     sort_querystring,
     update_querystring,
@@ -19,6 +21,7 @@ from coingecko_py.utils.utils import (
 
 TEST_ID = "TESTING_ID"
 TIME_PATCH_PATH = "coingecko_py.coingecko_py.time.sleep"
+PAGE_SENTINEL = "__PAGE__"
 
 
 @pytest.fixture(scope="class", autouse=True)
@@ -26,13 +29,13 @@ def cg(request):
     request.cls.cg = CoingeckoApi(log_level=10)
 
 
-@pytest.fixture(scope="class")
-def calls(request):
-    cg = request.cls.cg
+@pytest.fixture(scope="session")
+def api_calls():
+    # built once per session as materializing every endpoint url is relatively costly
     url_to_method = api_meta.get_url_to_method()
     expected_response = api_meta.get_test_api_responses()
     test_api_calls = api_meta.get_test_api_calls()
-    calls = list()
+    api_calls = list()
     for url_template, method_name in url_to_method.items():
         expected = expected_response[url_template]
         assert expected
@@ -43,9 +46,21 @@ def calls(request):
         args, kwargs = api_meta.transform_path_query_to_args_kwargs(
             url_template, path_args, query_args
         )
-        fn = getattr(cg, method_name)
-        calls.append((url, expected, fn, args, kwargs))
-    request.cls.calls = calls
+        api_calls.append((url, expected, method_name, args, kwargs))
+    return api_calls
+
+
+@pytest.fixture(scope="class")
+def calls(request, api_calls):
+    # api methods are bound to the client instance of the test class
+    cg = request.cls.cg
+    request.cls.calls = [
+        (url, expected, getattr(cg, method_name), args, kwargs)
+        for url, expected, method_name, args, kwargs in api_calls
+    ]
+    request.cls.url_to_expected = {
+        sort_querystring(url): expected for url, expected, _, _, _ in api_calls
+    }
 
 
 class MockResponse:
@@ -92,21 +107,48 @@ class FailThenSuccessServer:
             )
 
 
+class DispatchServer:
+    """known url ---> 200 (expected data body for url)
+    known url ---> status (empty body) if a non 200 status is given
+    unknown url ---> KeyError
+    """
+
+    def __init__(self, url_to_expected, status=200):
+        self.url_to_expected = url_to_expected
+        self.status = status
+
+    def request_callback(self, request):
+        expected = self.url_to_expected[sort_querystring(request.url)]
+        if self.status != 200:
+            return (self.status, {}, "")
+        return (200, {}, json.dumps(expected))
+
+
 @pytest.mark.usefixtures("cg")
 @pytest.mark.usefixtures("calls")
 class TestApiClient(unittest.TestCase):
 
     # ------------ TEST UTILS ----------------------
+    def _add_dispatch_callback(self, responses, status=200):
+        """Registers a single callback that responds to any known url, see DispatchServer"""
+        server = DispatchServer(self.url_to_expected, status=status)
+        responses.add_callback(
+            responses.GET,
+            re.compile(".*"),
+            callback=server.request_callback,
+            content_type="application/json",
+        )
+
     @pytest.mark.skip
     def _assert_urls_call_count(self, expected_urls, responses):
         """Asserts that the expected set of requested urls matches the actual set of
         requested urls. Performs normalization on url querystrings so order of
         query string params between compared urls does not matter.
         """
-        counter = Counter([sort_querystring(url) for url in expected_urls])
-        actual_call_counter = Counter()
-        for c in responses.calls:
-            actual_call_counter[sort_querystring(c.request.url)] += 1
+        counter = Counter(canonicalize_url(url) for url in expected_urls)
+        actual_call_counter = Counter(
+            canonicalize_url(c.request.url) for c in responses.calls
+        )
         assert counter == actual_call_counter
 
     @pytest.mark.skip
@@ -165,13 +207,9 @@ class TestApiClient(unittest.TestCase):
 
     @responses.activate
     def test_failed(self):
+        self._add_dispatch_callback(responses, status=404)
         expected_urls = list()
         for i, (url, expected, fn, args, kwargs) in enumerate(self.calls):
-            responses.add(
-                responses.GET,
-                url,
-                status=404,
-            )
             expected_urls.append(url)
             with pytest.raises(HTTPError) as exc_info:
                 fn(*args, **kwargs)
@@ -182,13 +220,9 @@ class TestApiClient(unittest.TestCase):
 
     @responses.activate
     def test_failed_queued(self):
+        self._add_dispatch_callback(responses, status=404)
         expected_urls = list()
         for i, (url, expected, fn, args, kwargs) in enumerate(self.calls):
-            responses.add(
-                responses.GET,
-                url,
-                status=404,
-            )
             expected_urls.append(url)
             fn(*args, **kwargs, qid=TEST_ID)
             assert len(self.cg._queued_calls) == 1
@@ -247,14 +281,9 @@ class TestApiClient(unittest.TestCase):
 
     @responses.activate
     def test_success(self):
+        self._add_dispatch_callback(responses)
         expected_urls = list()
         for i, (url, expected, fn, args, kwargs) in enumerate(self.calls):
-            responses.add(
-                responses.GET,
-                url,
-                json=expected,
-                status=200,
-            )
             expected_urls.append(url)
             response = fn(*args, **kwargs)
             assert len(responses.calls) == i + 1
@@ -263,14 +292,9 @@ class TestApiClient(unittest.TestCase):
 
     @responses.activate
     def test_success_queued(self):
+        self._add_dispatch_callback(responses)
         expected_urls = list()
         for i, (url, expected, fn, args, kwargs) in enumerate(self.calls):
-            responses.add(
-                responses.GET,
-                url,
-                json=expected,
-                status=200,
-            )
             expected_urls.append(url)
             fn(*args, **kwargs, qid=TEST_ID)
             assert len(self.cg._queued_calls) == 1
@@ -284,15 +308,10 @@ class TestApiClient(unittest.TestCase):
 
     @responses.activate
     def test_multiple_queued(self):
+        self._add_dispatch_callback(responses)
         expected_urls = list()
         for i, (url, expected, fn, args, kwargs) in enumerate(self.calls):
             qid = str(i)
-            responses.add(
-                responses.GET,
-                url,
-                json=expected,
-                status=200,
-            )
             expected_urls.append(url)
             fn(*args, **kwargs, qid=qid)
             assert len(self.cg._queued_calls) == i + 1
@@ -411,6 +430,8 @@ class TestApiClient(unittest.TestCase):
     @responses.activate
     def test_page_range_query_bounded(self):
         paginated_method_names = set(api_meta.get_paginated_method_names())
+        unqueued_method_names = set(paginated_method_names)
+        method_names = [fn.args[0].__name__ for _, _, fn, _, _ in self.calls]
         page_start = 1
         page_end = 3
         num_pages = page_end - page_start + 1
@@ -419,15 +440,17 @@ class TestApiClient(unittest.TestCase):
         expected_urls = []
         for i, (url, expected, fn, args, kwargs) in enumerate(self.calls):
             qid = str(i)
-            name = list(fn.args)[0].__name__
+            name = method_names[i]
             if name in paginated_method_names:
-                paginated_method_names.remove(name)
+                unqueued_method_names.remove(name)
                 qparams = extract_from_querystring(url, ["page"])
                 assert "page" in qparams
                 # add a response for all urls that will be queried within the page range
                 expected_paged[qid] = list()
+                # encode the querystring once and substitute the page per url
+                url_template = update_querystring(url, dict(page=PAGE_SENTINEL))
                 for new_page in range(page_start, page_end + 1):
-                    url_paged = update_querystring(url, dict(page=new_page))
+                    url_paged = url_template.replace(PAGE_SENTINEL, str(new_page))
                     expected_paged[qid].append([new_page, expected])
                     expected_urls.append(url_paged)
                     responses.add(
@@ -450,7 +473,7 @@ class TestApiClient(unittest.TestCase):
                 assert len(responses.calls) == 0
 
         # ensure we queued a test call for all paginated methods
-        assert len(paginated_method_names) == 0
+        assert len(unqueued_method_names) == 0
 
         response = self.cg.execute_queued()
         assert len(self.cg._queued_calls) == 0
@@ -458,7 +481,7 @@ class TestApiClient(unittest.TestCase):
 
         for i, (url, expected, fn, args, kwargs) in enumerate(self.calls):
             qid = str(i)
-            if list(fn.args)[0].__name__ in paginated_method_names:
+            if method_names[i] in paginated_method_names:
                 assert expected_paged[qid] == response[qid]
 
         self._assert_urls_call_count(expected_urls, responses)
@@ -466,6 +489,8 @@ class TestApiClient(unittest.TestCase):
     @responses.activate
     def test_page_range_query_unbounded(self):
         paginated_method_names = set(api_meta.get_paginated_method_names())
+        unqueued_method_names = set(paginated_method_names)
+        method_names = [fn.args[0].__name__ for _, _, fn, _, _ in self.calls]
         page_start = 1
         per_page = 5
         total = 19
@@ -489,17 +514,19 @@ class TestApiClient(unittest.TestCase):
 
         for i, (url, expected, fn, args, kwargs) in enumerate(self.calls):
             qid = str(i)
-            name = list(fn.args)[0].__name__
+            name = method_names[i]
             if name in paginated_method_names:
-                paginated_method_names.remove(name)
+                unqueued_method_names.remove(name)
                 qparams = extract_from_querystring(url, ["page"])
                 assert "page" in qparams
                 # add a response for all urls that will be queried within the page range
                 expected_paged[qid] = list()
+                # encode the querystring once and substitute the page per url
+                url_template = update_querystring(
+                    url, dict(page=PAGE_SENTINEL, per_page=per_page)
+                )
                 for new_page in range(page_start, page_end + 1):
-                    url_paged = update_querystring(
-                        url, dict(page=new_page, per_page=per_page)
-                    )
+                    url_paged = url_template.replace(PAGE_SENTINEL, str(new_page))
                     expected_paged[qid].append([new_page, expected])
                     expected_urls.append(url_paged)
                     responses.add_callback(
@@ -519,7 +546,7 @@ class TestApiClient(unittest.TestCase):
                 assert len(responses.calls) == 0
 
         # ensure we queued a test call for all paginated methods
-        assert len(paginated_method_names) == 0
+        assert len(unqueued_method_names) == 0
 
         response = self.cg.execute_queued()
         assert len(self.cg._queued_calls) == 0
@@ -527,7 +554,7 @@ class TestApiClient(unittest.TestCase):
 
         for i, (url, expected, fn, args, kwargs) in enumerate(self.calls):
             qid = str(i)
-            if list(fn.args)[0].__name__ in paginated_method_names:
+            if method_names[i] in paginated_method_names:
                 assert expected_paged[qid] == response[qid]
 
         self._assert_urls_call_count(expected_urls, responses)
@@ -1,4 +1,6 @@
+import os
 import logging
+import tempfile
 import unittest
 from unittest.mock import patch
 
@@ -8,6 +10,7 @@ from coingecko_py.utils.utils import (
     with_keys,
     extract_from_querystring,
     sort_querystring,
+    canonicalize_url,
     update_querystring,
     remove_from_querystring,
     dict_get,
@@ -43,6 +46,14 @@ class TestUtils(unittest.TestCase):
         assert url != expected
         assert result == expected
 
+    def test_canonicalize_url(self):
+        url = "scheme://website.com/api/endpoint?one=notice&two=me&three=senpai"
+        reordered = "scheme://website.com/api/endpoint?three=senpai&one=notice&two=me"
+        different = "scheme://website.com/api/endpoint?one=notice&two=you&three=senpai"
+        assert canonicalize_url(url) == canonicalize_url(reordered)
+        assert canonicalize_url(url) != canonicalize_url(different)
+        assert hash(canonicalize_url(url)) == hash(canonicalize_url(reordered))
+
     def test_update_querystring(self):
         url = "scheme://website.com/api/endpoint?one=notice&two=me&three=senpai"
         result = update_querystring(url, dict(two="moi", four="pls"))
@@ -80,7 +91,18 @@ class TestUtils(unittest.TestCase):
         foo()
         assert logger.level == level
 
+    def test_read_write(self):
+        # integers wider than 64 bits must round trip exactly
+        data = {"big": 123456789012345678901234567890, "list": [1, 2.5, "three"]}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "data.json")
+            api_meta.write(path, data)
+            assert api_meta.read(path) == data
+            api_meta.write(path, "not json", is_json=False)
+            assert api_meta.read(path, is_json=False) == "not json"
+
     def test_materialize_url_template(self):
+        url_base_parts = ("https", "dummy.com", "/api/v1")
         url_base = "https://dummy.com/api/v1"
         data = {
             "url_template": "/coins/{id}/contract/{contract_address}/market_chart/range",
@@ -88,15 +110,52 @@ class TestUtils(unittest.TestCase):
             "query": {"vs_currency": "eur", "to": "1638334800"},
         }
         with patch(
-            "coingecko_py.utils.api_meta.api_meta.get_url_base"
-        ) as patch_get_url_base:
-            patch_get_url_base.return_value = url_base
+            "coingecko_py.utils.api_meta.api_meta.get_url_base_parts"
+        ) as patch_get_url_base_parts:
+            patch_get_url_base_parts.return_value = url_base_parts
             result = api_meta.materialize_url_template(
                 data["url_template"], data["path"], data["query"]
             )
         expected = f"{url_base}/coins/ethereum/contract/0xdummyaddress/market_chart/range?vs_currency=eur&to=1638334800"
         assert result == expected
 
+    def test_materialize_url_template_arg_types(self):
+        # args that compare equal but format differently must give different urls
+        url_template = "/coins/{id}"
+        result_int = api_meta.materialize_url_template(url_template, [1], {"a": 1})
+        result_bool = api_meta.materialize_url_template(
+            url_template, [True], {"a": True}
+        )
+        result_float = api_meta.materialize_url_template(
+            url_template, [1.0], {"a": 1.0}
+        )
+        assert result_int.endswith("/coins/1?a=1")
+        assert result_bool.endswith("/coins/True?a=True")
+        assert result_float.endswith("/coins/1.0?a=1.0")
+
+    def test_materialize_url_template_unhashable_args(self):
+        url_template = "/coins/{id}"
+        result = api_meta.materialize_url_template(
+            url_template, ["bitcoin"], {"ids": ["a", "b"]}
+        )
+        assert result.endswith("/coins/bitcoin?ids=%5B%27a%27%2C+%27b%27%5D")
+
+    def test_write_spec_processed_clears_cache(self):
+        spec = dict(api_meta.get_spec_processed())
+        spec["host"] = "dummy.com"
+        assert api_meta.get_url_base_parts()[1] != "dummy.com"
+        try:
+            with patch.object(api_meta, "write"), patch.object(
+                api_meta, "read", return_value=spec
+            ):
+                api_meta.write_spec_processed(spec)
+                assert api_meta.get_spec_processed() is spec
+                assert api_meta.get_url_base_parts()[1] == "dummy.com"
+        finally:
+            api_meta.get_spec_processed.cache_clear()
+            api_meta.get_url_base_parts.cache_clear()
+        assert api_meta.get_url_base_parts()[1] != "dummy.com"
+
     def test_transform_path_query_to_args_kwargs(self):
         url_template = "/simple/token_price/{id}"
         parameters = [